@@ -1,17 +1,42 @@
 import importlib
 import inspect
 import io
+import sys
 import types
-from datetime import datetime
-from typing import Any, Callable, Dict, cast, Optional, Iterable
+import warnings
+import weakref
+from datetime import datetime, time
+from functools import partial
+from typing import Any, Callable, Dict, cast, Optional, Iterable, Iterator, Mapping
 
 import msgpack
 
+if (
+    sys.implementation.name == "cpython"
+    and msgpack.Packer.__module__ == "msgpack.fallback"
+):
+    warnings.warn(  # pragma: no cover
+        "msgpack C extension is not available, msgpickle will be slow",
+        RuntimeWarning,
+        stacklevel=2,
+    )
+
 
 class Unhandled:
     pass
 
 
+class NotSerializable(TypeError):
+    """Raised by dumps for unsupported objects, the message is built lazily."""
+
+    def __init__(self, name: str) -> None:
+        super().__init__(name)
+        self.name = name
+
+    def __str__(self) -> str:
+        return f"Object of type {self.name} is not serializable"
+
+
 def datetime_pack(obj: Any) -> Any:
     return obj.isoformat()
 
@@ -23,8 +48,27 @@ def datetime_unpack(obj: Any) -> Any:
 datetime_serializer = ("datetime.datetime", datetime_pack, datetime_unpack)
 
 
+def time_pack(obj: Any) -> Any:
+    if obj.tzinfo is not None:
+        return obj.isoformat()
+    return [obj.hour, obj.minute, obj.second, obj.microsecond]
+
+
+def time_unpack(obj: Any) -> Any:
+    if isinstance(obj, str):
+        return time.fromisoformat(obj)
+    return time(*obj)
+
+
+time_serializer = ("datetime.time", time_pack, time_unpack)
+
+
+def _import_module(name: str) -> Any:
+    return sys.modules.get(name) or importlib.import_module(name)
+
+
 def callable_pack(obj: Any) -> Any:
-    module = importlib.import_module(obj.__module__)
+    module = _import_module(obj.__module__)
     if getattr(module, obj.__name__, None) is not obj:
         return Unhandled
     return [obj.__module__, obj.__name__]
@@ -32,7 +76,7 @@ def callable_pack(obj: Any) -> Any:
 
 def callable_unpack(obj: Any) -> Any:
     module_name, func_name = obj
-    module = importlib.import_module(module_name)
+    module = _import_module(module_name)
     return getattr(module, func_name)
 
 
@@ -41,55 +85,112 @@ class_serializer = ("builtins.type", callable_pack, callable_unpack)
 
 code_type_params = inspect.signature(types.CodeType).parameters
 
+# this has a chance of working for future versions of Python
+_code_xmap = {"codestring": "code", "constants": "consts"}
+CODE_ATTR_NAMES: tuple[str, ...] = tuple(
+    "co_" + _code_xmap.get(param.name, param.name)
+    for param in code_type_params.values()
+)
 
-def cloud_func_pack(obj: Any) -> Any:
-    code_obj = obj.__code__
-    # this has a chance of working for future versions of Python
-    xmap = {"codestring": "code", "constants": "consts"}
-    code_arg_names = [
-        "co_" + xmap.get(param.name, param.name) for param in code_type_params.values()
-    ]
 
-    def convert(value: Any) -> Any:
-        if isinstance(value, tuple):
-            return list(value)
-        return value
+# packed code attributes by id(code), code objects are immutable so these
+# stay valid until the code object is collected
+_code_cache: dict[int, list[Any]] = {}
 
-    code_attributes = [convert(getattr(code_obj, attr)) for attr in code_arg_names]
-    return code_attributes
 
+def cloud_func_pack(obj: Any) -> Any:
+    code_obj = obj.__code__
+    packed = _code_cache.get(id(code_obj))
+    if packed is None:
+        packed = [
+            list(v) if isinstance(v, tuple) else v
+            for v in (getattr(code_obj, attr) for attr in CODE_ATTR_NAMES)
+        ]
+        _code_cache[id(code_obj)] = packed
+        weakref.finalize(code_obj, _code_cache.pop, id(code_obj), None)
+    return packed
 
-def cloud_func_unpack(obj: Any) -> Any:
-    def convert(value: Any) -> Any:
-        if isinstance(value, list):
-            return tuple(value)
-        return value
 
-    code_obj = types.CodeType(*[convert(v) for v in obj])
+def cloud_func_unpack(obj: Any) -> Any:
+    args: list[Any] = [tuple(v) if isinstance(v, list) else v for v in obj]
+    code_obj = types.CodeType(*args)
     return types.FunctionType(code_obj, globals(), code_obj.co_name)
 
 
 cloud_function_serializer = ("builtins.function", cloud_func_pack, cloud_func_unpack)
 
+# msgpack.Packer's default initial buffer size
+_PACKER_BUF_SIZE = 256 * 1024
+# idle packers kept per pickler, nested dumps can take many at once
+_PACKER_POOL_SIZE = 4
+
+
+def _slot_names(cls: type) -> tuple[str, ...]:
+    names = []
+    for base in reversed(cls.__mro__):
+        slots = base.__dict__.get("__slots__", ())
+        for name in (slots,) if isinstance(slots, str) else slots:
+            if name.startswith("__") and not name.endswith("__"):
+                name = f"_{base.__name__.lstrip('_')}{name}"
+            desc = base.__dict__.get(name)
+            if isinstance(desc, types.MemberDescriptorType):
+                names.append(name)
+    return tuple(names)
+
 
 class MsgPickle:
     CLASS = "."
     MODULE = "#"
     DATA = "d"
+    EXT = 42
 
     def __init__(
         self,
         use_default: bool = True,
         use_oo: None | tuple[str, str] = ("from_pack", "to_pack"),
+        use_timestamp: bool = False,
+        use_ext: bool = False,
     ) -> None:
         self._name_map: dict[str, int] = {}
         self._num_map: dict[int, str] = {}
-        self.loaders: Dict[str, Callable[[Any], Any]] = {}
-        self.dumpers: Dict[str, Callable[[Any], Any]] = {}
+        self._enum_ext = False
+        # pack aware datetimes as msgpack's native timestamp ext type
+        self._use_timestamp = use_timestamp
+        # pack objects as ExtType(EXT, [module, class, data])
+        self._use_ext = use_ext
         self.hooks: list[Callable[[Any, Any], Any]] = []
-        self.handlers: list[Callable[[Any], Any]] = []
-
-        self.__sig = sorted([self.CLASS, self.MODULE, self.DATA])
+        # dumps and loads cache what they find in these, so they are only
+        # changed by register() and add_handler(), and public as read only views
+        self._loaders: Dict[str, Callable[[Any], Any]] = {}
+        self._dumpers: Dict[str, Callable[[Any], Any]] = {}
+        self._handlers: list[Callable[[Any], Any]] = []
+        # types a handler was added for, and the handlers that apply per type
+        self._handler_types: dict[Callable[[Any], Any], tuple[type, ...]] = {}
+        # caches by type are weak, so dumping short lived classes doesn't
+        # keep them alive, and their values mustn't refer back to the class
+        self._handlers_by_type: weakref.WeakKeyDictionary[
+            type, list[Callable[[Any], Any]]
+        ] = weakref.WeakKeyDictionary()
+        # (full name, loader, class) by (module, class) names from a payload,
+        # only for names that resolved, so bogus payloads can't grow it
+        self._cls_cache: dict[tuple[Any, Any], tuple[str, Any, Any]] = {}
+        # (module, class, full name, dumper) by type, so dumps doesn't format
+        # names or look up the registered dumper per object
+        self._dump_cache: weakref.WeakKeyDictionary[type, tuple[str, str, str, Any]] = (
+            weakref.WeakKeyDictionary()
+        )
+        # whether a type has a callable to_pack, and the class's from_pack
+        self._has_to_pack: weakref.WeakKeyDictionary[type, bool] = (
+            weakref.WeakKeyDictionary()
+        )
+        # a bound from_pack refers to its class, so this one is strong, it only
+        # holds loaded classes, which _cls_cache keeps anyway
+        self._from_pack_by_type: dict[type, Any] = {}
+        # (mangled) slot names across the MRO, for the default dumper and
+        # loader, None for classes without __slots__
+        self._slot_names: weakref.WeakKeyDictionary[Any, Any] = (
+            weakref.WeakKeyDictionary()
+        )
 
         if use_default:
             self.add_handler(self._default_obj_dump)
@@ -98,118 +199,331 @@ class MsgPickle:
             self.register(*function_serializer)
 
         self.use_oo = use_oo
-
-    def use_enumeration(self, enum: Optional[Iterable[str]] = None) -> None:
-        if enum is None:
-            enum = list(self.dumpers.keys())
+        self._bind_hooks()
+
+    def _bind_hooks(self) -> None:
+        # msgpack callbacks are built once, rather than per dumps/loads call,
+        # and specialized for whether enumeration or EXT is in use
+        if self._name_map:
+            dump, load = self._do_dump_enumerated, self._do_load_enumerated
+        elif self._use_ext:
+            dump, load = self._do_dump_ext, self._do_load
+        else:
+            dump, load = self._do_dump, self._do_load
+        self._dump_obj = partial(dump, strict=False)
+        self._dump_obj_strict = partial(dump, strict=True)
+        self._object_hook = partial(load, strict=False)
+        self._object_hook_strict = partial(load, strict=True)
+        self._ext_hook = partial(self._do_load_ext, strict=False)
+        self._ext_hook_strict = partial(self._do_load_ext, strict=True)
+        # idle packers bound to the callbacks above, taken and returned by
+        # dumps() so nested and concurrent calls never share one
+        self._packers: list[Any] = []
+        self._packers_strict: list[Any] = []
+
+    @property
+    def loaders(self) -> Mapping[str, Callable[[Any], Any]]:
+        return types.MappingProxyType(self._loaders)
+
+    @property
+    def dumpers(self) -> Mapping[str, Callable[[Any], Any]]:
+        return types.MappingProxyType(self._dumpers)
+
+    @property
+    def handlers(self) -> tuple[Callable[[Any], Any], ...]:
+        return tuple(self._handlers)
+
+    @property
+    def use_oo(self) -> None | tuple[str, str]:
+        return self._use_oo
+
+    @use_oo.setter
+    def use_oo(self, use_oo: None | tuple[str, str]) -> None:
+        self._use_oo = use_oo
+        self._dump_cache.clear()
+        self._has_to_pack.clear()
+        self._from_pack_by_type.clear()
+
+    def use_enumeration(
+        self, enum: Optional[Iterable[str]] = None, use_ext: bool = False
+    ) -> None:
+        enum = list(self._dumpers.keys() if enum is None else enum)
+        if use_ext and len(enum) > 128:
+            raise ValueError("use_ext supports at most 128 enumerated classes")
+        self._enum_ext = use_ext
         self._name_map = {k: i for i, k in enumerate(enum)}
         self._num_map = {i: k for i, k in enumerate(enum)}
+        self._bind_hooks()
 
     def dumps(self, obj: Any, strict: bool = False) -> bytes:
         """Serialize an object to msgpack format, with custom handling for objects with to_pack method."""
-
-        def _dump_obj(o: Any) -> Dict[str, Any]:
-            cls_name: str | int = type(o).__name__
-            mod_name = o.__class__.__module__
+        pool, packer = self._take_packer(strict)
+        ret = cast(bytes, packer.pack(obj))
+        # packers keep their buffer, don't hold on to ones grown by big payloads
+        if len(ret) <= _PACKER_BUF_SIZE and len(pool) < _PACKER_POOL_SIZE:
+            pool.append(packer)
+        return ret
+
+    def dumps_many(self, objs: Iterable[Any], strict: bool = False) -> bytes:
+        """Serialize objects back to back with one packer, see loads_many."""
+        pool, packer = self._take_packer(strict)
+        largest = 0
+        chunks = []
+        for obj in objs:
+            chunk = packer.pack(obj)
+            largest = max(largest, len(chunk))
+            chunks.append(chunk)
+        if largest <= _PACKER_BUF_SIZE and len(pool) < _PACKER_POOL_SIZE:
+            pool.append(packer)
+        return b"".join(chunks)
+
+    def _take_packer(self, strict: bool) -> tuple[list[Any], Any]:
+        pool = self._packers_strict if strict else self._packers
+        try:
+            return pool, pool.pop()
+        except IndexError:
+            default = self._dump_obj_strict if strict else self._dump_obj
+            packer = msgpack.Packer(
+                default=default, strict_types=True, datetime=self._use_timestamp
+            )
+            return pool, packer
+
+    def _do_dump(self, o: Any, strict: bool) -> Any:
+        use_oo = self._use_oo
+        cls = type(o)
+        entry = self._dump_cache.get(cls)
+        if entry is None:
+            entry = self._dump_entry(cls)
+        mod_name, cls_name, full_class_name, serial = entry
+        data = Unhandled
+        if serial:
+            data = serial(o)
+        elif use_oo and self._to_pack(cls, use_oo[1]):
+            data = getattr(o, use_oo[1])()
+        elif not strict:
+            handlers = self._handlers_by_type.get(cls)
+            if handlers is None:
+                handlers = self._handlers_for(cls)
+            for handler in handlers:
+                data = handler(o)
+                if data is not Unhandled:
+                    break
+        if data is Unhandled:
+            raise NotSerializable(full_class_name)
+        # a fresh map per object: msgpack calls default again for nested
+        # objects while it is still packing this one, so it can't be reused
+        return {self.CLASS: cls_name, self.MODULE: mod_name, self.DATA: data}
+
+    def _dump_entry(self, cls: type) -> tuple[str, str, str, Any]:
+        # the nearest registered base class, packed under that class's name,
+        # unless a class before it defines to_pack, then it's packed as itself
+        use_oo = self._use_oo
+        for base in cls.__mro__:
+            mod_name, cls_name = base.__module__, base.__name__
+            full_class_name = f"{mod_name}.{cls_name}"
+            if serial := self._dumpers.get(full_class_name):
+                break
+            if use_oo and use_oo[1] in base.__dict__:
+                break
+        if not serial:
+            mod_name, cls_name = cls.__module__, cls.__name__
             full_class_name = f"{mod_name}.{cls_name}"
-            if self._name_map:
-                cls_name = self._name_map[full_class_name]
-                mod_name = ""
-            ret = {
-                self.CLASS: cls_name,
-                self.MODULE: mod_name,
-            }
-            data = Unhandled
-            if serial := self.dumpers.get(full_class_name):
-                data = serial(o)
-            elif (
-                self.use_oo
-                and hasattr(o, self.use_oo[1])
-                and callable(getattr(o, self.use_oo[1]))
-            ):
-                data = getattr(o, self.use_oo[1])()
-            elif not strict:
-                for handler in self.handlers:
-                    data = handler(o)
-                    if data is not Unhandled:
-                        break
-            if data is Unhandled:
-                raise TypeError(f"Object of type {full_class_name} is not serializable")
-            ret[self.DATA] = data
-            return ret
-
-        return cast(bytes, msgpack.dumps(obj, default=_dump_obj, strict_types=True))
+        entry = self._dump_cache[cls] = (mod_name, cls_name, full_class_name, serial)
+        return entry
+
+    def _do_dump_enumerated(self, o: Any, strict: bool) -> Any:
+        ret = self._do_dump(o, strict)
+        # register() on another thread may have cleared the cache meanwhile
+        cls = type(o)
+        entry = self._dump_cache.get(cls) or self._dump_entry(cls)
+        num = self._name_map[entry[2]]
+        if self._enum_ext:
+            return msgpack.ExtType(num, self.dumps(ret[self.DATA], strict))
+        ret[self.CLASS] = num
+        ret[self.MODULE] = ""
+        return ret
+
+    def _do_dump_ext(self, o: Any, strict: bool) -> Any:
+        ret = self._do_dump(o, strict)
+        obj = [ret[self.MODULE], ret[self.CLASS], ret[self.DATA]]
+        return msgpack.ExtType(self.EXT, self.dumps(obj, strict))
 
     def loads(self, packed: bytes, strict: bool = False) -> Any:
         """Deserialize a msgpack format object, with custom handling for objects with from_pack method."""
-
-        def object_hook(code: Any) -> Any:
-            if isinstance(code, dict) and sorted(code.keys()) == self.__sig:
-                module_name = code[self.MODULE]
-                class_name = code[self.CLASS]
-                if self._num_map:
-                    module_name, class_name = self._num_map[class_name].rsplit(".", 1)
-                full_class_name = f"{module_name}.{class_name}"
-                data = code[self.DATA]
-                if loader := self.loaders.get(full_class_name):
-                    return loader(data)
-                try:
-                    module = importlib.import_module(module_name)
-                    cls = getattr(module, class_name)
-                except (AttributeError, ImportError):
-                    raise TypeError(
-                        f"Object of type {full_class_name} is not deserializable"
-                    )
-                if (
-                    self.use_oo
-                    and hasattr(cls, self.use_oo[0])
-                    and callable(getattr(cls, self.use_oo[0]))
-                ):
-                    return cls.from_pack(data)
-                if strict:
-                    raise TypeError(
-                        f"Object of type {full_class_name} is not deserializable"
-                    )
-                ret = Unhandled
-                for hook in self.hooks:
-                    ret = hook(cls, data)
-                    if ret is not Unhandled:
-                        return ret
-                if ret is Unhandled:
-                    raise TypeError(
-                        f"Object of type {full_class_name} is not deserializable"
-                    )
-            return code
-
-        return msgpack.loads(packed, object_hook=object_hook)
-
-    @staticmethod
-    def _default_obj_dump(o: Any) -> Any:
-        if isinstance(o, io.IOBase):
-            return Unhandled
-
-        data: Any
-        if hasattr(o, "__dict__") and isinstance(o.__dict__, dict):
-            data = o.__dict__
-        elif isinstance(o, tuple):
-            data = list(o)
-        elif hasattr(o.__class__, "__slots__"):
-            data = {slot: getattr(o, slot) for slot in o.__slots__}
+        if strict:
+            hook, ext_hook = self._object_hook_strict, self._ext_hook_strict
+        else:
+            hook, ext_hook = self._object_hook, self._ext_hook
+        return msgpack.loads(
+            packed,
+            object_hook=hook,
+            ext_hook=ext_hook,
+            timestamp=3 if self._use_timestamp else 0,
+            strict_map_key=False,
+        )
+
+    def loads_many(self, packed: bytes, strict: bool = False) -> Iterator[Any]:
+        """Deserialize each object from back to back msgpack data, see dumps_many."""
+        if strict:
+            hook, ext_hook = self._object_hook_strict, self._ext_hook_strict
         else:
+            hook, ext_hook = self._object_hook, self._ext_hook
+        unpacker = msgpack.Unpacker(
+            object_hook=hook,
+            ext_hook=ext_hook,
+            timestamp=3 if self._use_timestamp else 0,
+            strict_map_key=False,
+            max_buffer_size=len(packed),
+        )
+        unpacker.feed(packed)
+        # the unpacker stops quietly at a partial object, and counts its bytes
+        # in tell(), so track where the last whole object ended
+        end = 0
+        for obj in unpacker:
+            end = unpacker.tell()
+            yield obj
+        if end != len(packed):
+            raise ValueError("Incomplete msgpack data")
+
+    def _do_load(self, code: Any, strict: bool) -> Any:
+        _C, _M, _D = self.CLASS, self.MODULE, self.DATA
+        if (
+            type(code) is dict
+            and len(code) == 3
+            and _C in code
+            and _M in code
+            and _D in code
+        ):
+            return self._load_obj(code[_M], code[_C], code[_D], strict)
+        return code
+
+    def _do_load_enumerated(self, code: Any, strict: bool) -> Any:
+        _C, _M, _D = self.CLASS, self.MODULE, self.DATA
+        if (
+            type(code) is dict
+            and len(code) == 3
+            and _C in code
+            and _M in code
+            and _D in code
+        ):
+            module_name, class_name = self._num_map[code[_C]].rsplit(".", 1)
+            return self._load_obj(module_name, class_name, code[_D], strict)
+        return code
+
+    def _do_load_ext(self, code: int, packed: bytes, strict: bool) -> Any:
+        # enumerated ext codes take precedence over EXT
+        if self._enum_ext and code in self._num_map:
+            module_name, class_name = self._num_map[code].rsplit(".", 1)
+            data = self.loads(packed, strict)
+            return self._load_obj(module_name, class_name, data, strict)
+        if self._use_ext and code == self.EXT:
+            obj = self.loads(packed, strict)
+            if type(obj) is not list or len(obj) != 3:
+                raise TypeError("Object of type ExtType is not deserializable")
+            return self._load_obj(obj[0], obj[1], obj[2], strict)
+        return msgpack.ExtType(code, packed)
+
+    def _load_obj(
+        self, module_name: Any, class_name: Any, data: Any, strict: bool
+    ) -> Any:
+        use_oo = self._use_oo
+        entry = self._cls_cache.get((module_name, class_name))
+        # re-resolve if the module was reloaded or the class rebound
+        if entry is None or (
+            entry[2] is not None
+            and getattr(sys.modules.get(module_name), class_name, None) is not entry[2]
+        ):
+            entry = self._resolve(module_name, class_name)
+        full_class_name, loader, cls = entry
+        if loader:
+            return loader(data)
+        if cls is Unhandled:
+            raise TypeError(f"Object of type {full_class_name} is not deserializable")
+        if use_oo and (from_pack := self._from_pack(cls, use_oo[0])):
+            return from_pack(data)
+        if strict:
+            raise TypeError(f"Object of type {full_class_name} is not deserializable")
+        ret = Unhandled
+        for hook in self.hooks:
+            ret = hook(cls, data)
+            if ret is not Unhandled:
+                return ret
+        raise TypeError(f"Object of type {full_class_name} is not deserializable")
+
+    def _resolve(self, module_name: Any, class_name: Any) -> tuple[str, Any, Any]:
+        full_class_name = f"{module_name}.{class_name}"
+        loader = self._loaders.get(full_class_name)
+        cls: Any = None
+        if not loader:
+            try:
+                cls = getattr(_import_module(module_name), class_name)
+            except (AttributeError, ImportError):
+                return full_class_name, None, Unhandled
+        entry = self._cls_cache[(module_name, class_name)] = (
+            full_class_name,
+            loader,
+            cls,
+        )
+        return entry
+
+    def _to_pack(self, cls: type, name: str) -> bool:
+        has = self._has_to_pack.get(cls)
+        if has is None:
+            has = self._has_to_pack[cls] = callable(getattr(cls, name, None))
+        return has
+
+    def _from_pack(self, cls: Any, name: str) -> Any:
+        method = self._from_pack_by_type.get(cls, Unhandled)
+        if method is Unhandled:
+            method = getattr(cls, name, None)
+            if not callable(method):
+                method = None
+            self._from_pack_by_type[cls] = method
+        return method
+
+    def _slots_for(self, cls: Any) -> Any:
+        names = self._slot_names.get(cls, Unhandled)
+        if names is Unhandled:
+            names = _slot_names(cls) if hasattr(cls, "__slots__") else None
+            self._slot_names[cls] = names
+        return names
+
+    def _default_obj_dump(self, o: Any) -> Any:
+        if isinstance(o, io.IOBase):
             return Unhandled
 
-        return data
+        data: Any = getattr(o, "__dict__", None)
+        # exactly a dict, msgpack won't pack subclasses like defaultdict
+        if type(data) is dict:
+            # a subclass of a slotted class has both, copy rather than
+            # adding the slot values to the live __dict__
+            if slots := self._slots_for(type(o)):
+                return {
+                    **{name: getattr(o, name) for name in slots if hasattr(o, name)},
+                    **data,
+                }
+            return data
+        if isinstance(o, tuple):
+            return list(o)
+        if (slots := self._slots_for(type(o))) is not None:
+            return {name: getattr(o, name) for name in slots if hasattr(o, name)}
+        return Unhandled
 
-    @staticmethod
-    def _default_obj_load(cls: Any, data: Any) -> Any:
-        if isinstance(data, list):
+    def _default_obj_load(self, cls: Any, data: Any) -> Any:
+        data_type = type(data)
+        if data_type is list:
             return cls(*data)
-        elif hasattr(cls, "__slots__"):
-            inst = cls.__new__(cls, *data)
+        slots = self._slots_for(cls)
+        if slots is not None and data_type is dict:
+            inst = cls.__new__(cls)
             for k, v in data.items():
-                setattr(inst, k, v)
+                # set slots past any custom __setattr__
+                if k in slots:
+                    object.__setattr__(inst, k, v)
+                else:
+                    setattr(inst, k, v)
             return inst
-        elif isinstance(data, dict):
+        elif data_type is dict:
             inst = cls.__new__(cls)
             inst.__dict__ = data
             return inst
@@ -220,30 +534,54 @@ class MsgPickle:
         self, name: str, pack: Callable[[Any], Any], unpack: Callable[[Any], Any]
     ) -> None:
         if pack is not None:
-            self.dumpers[name] = pack
+            self._dumpers[name] = pack
+            self._dump_cache.clear()
         if unpack is not None:
-            self.loaders[name] = unpack
+            self._loaders[name] = unpack
+            self._cls_cache.clear()
 
     def add_hook(self, hook: Callable[[Any, Any], Any]) -> None:
         self.hooks.append(hook)
 
-    def add_handler(self, handler: Callable[[Any], Any]) -> None:
-        self.handlers.append(handler)
+    def add_handler(
+        self, handler: Callable[[Any], Any], types: tuple[type, ...] | None = None
+    ) -> None:
+        """Add a fallback dumper, only tried for instances of `types` if given."""
+        if types is not None:
+            self._handler_types[handler] = types
+        self._handlers.append(handler)
+        self._handlers_by_type.clear()
+
+    def _handlers_for(self, cls: type) -> list[Callable[[Any], Any]]:
+        handlers = [
+            handler
+            for handler in self._handlers
+            if handler not in self._handler_types
+            or issubclass(cls, self._handler_types[handler])
+        ]
+        self._handlers_by_type[cls] = handlers
+        return handlers
 
 
 _glob = MsgPickle()
 
 dumps = _glob.dumps
 loads = _glob.loads
+dumps_many = _glob.dumps_many
+loads_many = _glob.loads_many
 register = _glob.register
 
 __all__ = [
     "dumps",
     "loads",
+    "dumps_many",
+    "loads_many",
     "register",
     "MsgPickle",
+    "NotSerializable",
     "Unhandled",
     "datetime_serializer",
+    "time_serializer",
     "function_serializer",
     "cloud_function_serializer",
 ]
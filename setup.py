@@ -0,0 +1,16 @@
+import os
+
+from setuptools import setup
+
+ext_modules = []
+if os.environ.get("MSGPICKLE_ENABLE_SPEEDUPS") == "1":
+    # msgpickle.py is valid Cython in pure-python mode, the plain module is
+    # the fallback when the extension isn't built
+    from Cython.Build import cythonize
+
+    ext_modules = cythonize(
+        "msgpickle.py",
+        compiler_directives={"language_level": 3, "annotation_typing": False},
+    )
+
+setup(py_modules=["msgpickle"], ext_modules=ext_modules)
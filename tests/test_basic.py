@@ -1,7 +1,9 @@
+import gc
 import threading
+import weakref
 from collections import defaultdict
 from dataclasses import dataclass
-from datetime import datetime, time
+from datetime import datetime, time, timezone
 from typing import NamedTuple
 
 import msgpack
@@ -26,6 +28,31 @@ class CustomClass:
         return f"CustomClass(attr1={self.attr1}, attr2={self.attr2})"
 
 
+class RenamedOO:
+    def __init__(self, attr):
+        self.attr = attr
+
+    def dump_me(self):
+        return self.attr
+
+    @classmethod
+    def load_me(cls, data):
+        return cls(data)
+
+
+def test_renamed_oo():
+    pickler = msgpickle.MsgPickle(use_default=False, use_oo=("load_me", "dump_me"))
+    assert pickler.use_oo == ("load_me", "dump_me")
+    serialized = pickler.dumps(RenamedOO(5), strict=True)
+    assert pickler.loads(serialized, strict=True).attr == 5
+
+    pickler.use_oo = None
+    with pytest.raises(TypeError):
+        pickler.dumps(RenamedOO(5))
+    with pytest.raises(TypeError):
+        pickler.loads(serialized)
+
+
 @dataclass
 class ExampleDataClass:
     field1: int
@@ -65,6 +92,85 @@ def test_ExampleNamedTuple_serialization():
     assert deserialized.field1 == obj.field1 and deserialized.field2 == obj.field2
 
 
+def test_nested_objects():
+    inner = ExampleDataClass(field1=1, field2="a")
+    obj = ExampleDataClass(field1=[inner, inner], field2=ExampleNamedTuple(2, "b"))
+    deserialized = msgpickle.loads(msgpickle.dumps(obj))
+    assert deserialized.field1[1].field2 == "a"
+    assert deserialized.field2.field1 == 2
+
+
+class Reentrant:
+    def __init__(self, inner):
+        self.inner = inner
+
+    def to_pack(self):
+        return msgpickle.dumps(self.inner)
+
+    @classmethod
+    def from_pack(cls, data):
+        return cls(msgpickle.loads(data))
+
+
+def test_packer_reuse():
+    # nested dumps() calls from inside a dump must not share a packer
+    obj = [Reentrant(ExampleDataClass(1, "a")), ExampleDataClass(2, "b")]
+    deserialized = msgpickle.loads(msgpickle.dumps(obj))
+    assert deserialized[0].inner.field2 == "a"
+    assert deserialized[1].field2 == "b"
+
+    big = [b"x" * 300_000, ExampleDataClass(3, "c")]
+    assert msgpickle.dumps(big) == msgpickle.dumps(big)
+
+    with pytest.raises(TypeError):
+        msgpickle.dumps([1, threading.Lock()])
+    assert msgpickle.loads(msgpickle.dumps([1])) == [1]
+
+    # each level of a use_ext object holds a packer, only a few are kept
+    serializer = msgpickle.MsgPickle(use_ext=True)
+    deep = None
+    for i in range(40):
+        deep = ExampleDataClass(i, deep)
+    assert serializer.loads(serializer.dumps(deep)).field1 == 39
+    assert len(serializer._packers) <= msgpickle._PACKER_POOL_SIZE
+
+
+@pytest.mark.parametrize("strict", [True, False])
+def test_many(strict):
+    objs = [CustomClass(i, str(i)) for i in range(3)] + [{"a": 1}, [1, 2], None]
+    serialized = msgpickle.dumps_many(objs, strict=strict)
+    assert serialized == b"".join(msgpickle.dumps(o, strict=strict) for o in objs)
+    deserialized = list(msgpickle.loads_many(serialized, strict=strict))
+    assert [o.attr2 for o in deserialized[:3]] == ["0", "1", "2"]
+    assert deserialized[3:] == objs[3:]
+
+    assert msgpickle.dumps_many([]) == b""
+    assert list(msgpickle.loads_many(b"")) == []
+    with pytest.raises(ValueError):
+        list(msgpickle.loads_many(msgpickle.dumps_many([1, "abc", [1, 2, 3]])[:-1]))
+    msgpickle.dumps_many([b"x" * 300_000])
+
+
+def test_shared_across_threads():
+    serializer = msgpickle.MsgPickle()
+    objs = [[ExampleDataClass(i, str(i))] * 50 for i in range(8)]
+    expected = [serializer.dumps(o) for o in objs]
+    results = {}
+
+    def work(i):
+        for _ in range(50):
+            assert serializer.dumps(objs[i]) == expected[i]
+            assert serializer.loads(expected[i])[-1].field1 == i
+        results[i] = True
+
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(results) == 8
+
+
 def test_namedtuple_must_be_strict_serialization():
     obj = ExampleNamedTuple(field1=456, field2="def")
     with pytest.raises(TypeError):
@@ -101,6 +207,30 @@ def test_time_serialization(strict):
     assert deserialized_time == original_time
 
 
+def test_time_serializer():
+    serializer = msgpickle.MsgPickle()
+    serializer.register(*msgpickle.time_serializer)
+    naive = time(1, 2, 3, 4)
+    serialized = serializer.dumps(naive)
+    assert msgpack.loads(serialized)["d"] == [1, 2, 3, 4]
+    assert serializer.loads(serialized) == naive
+
+    aware = time(1, 2, tzinfo=timezone.utc)
+    assert serializer.loads(serializer.dumps(aware)) == aware
+
+
+def test_module_functions_share_default():
+    default = msgpickle.dumps.__self__
+    assert isinstance(default, msgpickle.MsgPickle)
+    for func in (
+        msgpickle.loads,
+        msgpickle.register,
+        msgpickle.dumps_many,
+        msgpickle.loads_many,
+    ):
+        assert func.__self__ is default
+
+
 def test_partial_registration():
     serializer = msgpickle.MsgPickle()
     original_time = time(1, 2)
@@ -133,6 +263,64 @@ def test_enumeration():
     deserialized_time = serializer.loads(serialized)
     assert deserialized_time == original_time
 
+    # plain maps still pass through the enumerated hook
+    obj = {"a": [original_time]}
+    assert serializer.loads(serializer.dumps(obj)) == obj
+
+    # the dump cache is cleared by register() while the object is packed
+    def pack_and_register(obj):
+        serializer.register("datetime.date", str, None)
+        return pack_time(obj)
+
+    serializer.register("datetime.time", pack_and_register, unpack_time)
+    assert serializer.loads(serializer.dumps(original_time)) == original_time
+
+
+@pytest.mark.parametrize("strict", [True, False])
+def test_enumeration_ext(strict):
+    serializer = msgpickle.MsgPickle()
+    serializer.register("datetime.time", pack_time, unpack_time)
+    serializer.use_enumeration(["datetime.time", __name__ + ".CustomClass"], True)
+    obj = CustomClass(time(1, 2), [time(3, 4)])
+    serialized = serializer.dumps(obj, strict=strict)
+
+    insp = msgpack.loads(serialized)
+    assert insp.code == 1
+
+    deserialized = serializer.loads(serialized, strict=strict)
+    assert deserialized.attr1 == obj.attr1 and deserialized.attr2 == obj.attr2
+
+    # ext codes that aren't enumerated are left alone
+    other = msgpack.dumps(msgpack.ExtType(5, b"x"))
+    assert serializer.loads(other) == msgpack.ExtType(5, b"x")
+
+    with pytest.raises(ValueError):
+        serializer.use_enumeration([str(i) for i in range(129)], True)
+
+
+@pytest.mark.parametrize("strict", [True, False])
+def test_ext(strict):
+    serializer = msgpickle.MsgPickle(use_ext=True)
+    obj = CustomClass(datetime(2024, 1, 2), [CustomClass(1, 2)])
+    serialized = serializer.dumps(obj, strict=strict)
+
+    insp = msgpack.loads(serialized)
+    assert insp.code == msgpickle.MsgPickle.EXT
+    assert msgpack.loads(insp.data)[:2] == [__name__, "CustomClass"]
+
+    deserialized = serializer.loads(serialized, strict=strict)
+    assert deserialized.attr1 == obj.attr1
+    assert deserialized.attr2[0].attr2 == 2
+
+    # tagged maps still load, and a pickler without use_ext leaves EXT alone
+    old = msgpickle.dumps(obj, strict=strict)
+    assert serializer.loads(old, strict=strict).attr1 == obj.attr1
+    assert msgpickle.loads(serialized) == insp
+
+    bad = msgpack.dumps(msgpack.ExtType(msgpickle.MsgPickle.EXT, msgpack.dumps(1)))
+    with pytest.raises(TypeError):
+        serializer.loads(bad)
+
 
 @pytest.mark.parametrize("strict", [True, False])
 def test_datetime_serialization(strict):
@@ -142,6 +330,84 @@ def test_datetime_serialization(strict):
     assert deserialized_datetime == original_datetime
 
 
+def test_datetime_timestamp():
+    serializer = msgpickle.MsgPickle(use_timestamp=True)
+    aware = datetime.now(timezone.utc)
+    serialized = serializer.dumps(aware)
+    assert msgpack.loads(serialized) == msgpack.Timestamp.from_datetime(aware)
+    assert serializer.loads(serialized) == aware
+
+    # naive datetimes can't be timestamps, they use the registered serializer
+    naive = datetime.now()
+    assert serializer.loads(serializer.dumps(naive)) == naive
+
+
+class MyDatetime(datetime):
+    pass
+
+
+def test_registered_base_class():
+    obj = MyDatetime(2024, 1, 2, 3, 4)
+    serialized = msgpickle.dumps(obj, strict=True)
+    assert msgpack.loads(serialized)["."] == "datetime"
+    deserialized = msgpickle.loads(serialized, strict=True)
+    assert type(deserialized) is datetime and deserialized == obj
+
+
+class PackedBase:
+    def __init__(self, val):
+        self.val = val
+
+
+class PackedChild(PackedBase):
+    def to_pack(self):
+        return self.val
+
+    @classmethod
+    def from_pack(cls, data):
+        return cls(data)
+
+
+def test_registries_read_only():
+    serializer = msgpickle.MsgPickle()
+    obj = PackedBase(1)
+    with pytest.raises(TypeError):
+        serializer.dumps(obj, strict=True)
+    with pytest.raises(TypeError):
+        serializer.dumpers[f"{__name__}.PackedBase"] = lambda o: o.val
+    with pytest.raises(TypeError):
+        serializer.loaders[f"{__name__}.PackedBase"] = PackedBase
+    assert serializer.handlers == (serializer._default_obj_dump,)
+    assert "datetime.datetime" in serializer.dumpers
+
+    # register() after a type was dumped still takes effect
+    serializer.register(f"{__name__}.PackedBase", lambda o: o.val, PackedBase)
+    assert serializer.loads(serializer.dumps(obj, strict=True), strict=True).val == 1
+
+
+def test_own_to_pack_beats_registered_base():
+    serializer = msgpickle.MsgPickle()
+    serializer.register(
+        f"{__name__}.PackedBase", lambda o: o.val, lambda d: PackedBase(d)
+    )
+    deser = serializer.loads(serializer.dumps(PackedChild(3)))
+    assert type(deser) is PackedChild and deser.val == 3
+    deser = serializer.loads(serializer.dumps(PackedBase(4)))
+    assert type(deser) is PackedBase and deser.val == 4
+
+
+class PackedGrandchild(PackedChild):
+    pass
+
+
+def test_inherited_to_pack_packs_own_name():
+    serializer = msgpickle.MsgPickle()
+    serialized = serializer.dumps(PackedGrandchild(5))
+    assert msgpack.loads(serialized)["."] == "PackedGrandchild"
+    deser = serializer.loads(serialized)
+    assert type(deser) is PackedGrandchild and deser.val == 5
+
+
 def func1():
     return 1
 
@@ -162,6 +428,8 @@ def test_non_serializable_function_raises():
     assert "Object of type" in str(exc_info.value) and "is not serializable" in str(
         exc_info.value
     )
+    assert isinstance(exc_info.value, msgpickle.NotSerializable)
+    assert exc_info.value.name == "builtins.function"
 
 
 def test_cloud_functions():
@@ -172,6 +440,36 @@ def test_cloud_functions():
     assert ok(4) == 4
 
 
+def test_cloud_functions_cache():
+    serializer = msgpickle.MsgPickle(use_default=False)
+    serializer.register(*msgpickle.cloud_function_serializer)
+
+    # code compiled at runtime, so nothing else keeps it alive
+    fn = eval(compile("lambda x: x + 1", "<test>", "eval"))
+    code_id = id(fn.__code__)
+    assert serializer.dumps(fn) == serializer.dumps(fn)
+    assert code_id in msgpickle._code_cache
+    assert serializer.loads(serializer.dumps(fn))(1) == 2
+
+    del fn
+    gc.collect()
+    assert code_id not in msgpickle._code_cache
+
+
+def test_dumped_classes_not_kept_alive():
+    refs = []
+    for i in range(100):
+        slots = {"__slots__": ("a",)} if i % 2 else {}
+        cls = type(f"Dynamic{i}", (), slots)
+        obj = cls()
+        obj.a = i
+        msgpickle.dumps(obj)
+        refs.append(weakref.ref(cls))
+    del cls, obj
+    gc.collect()
+    assert not any(ref() for ref in refs)
+
+
 class MyClass:
     def __init__(self, x):
         self.__x = x
@@ -189,6 +487,27 @@ def test_my_class():
     assert ok.x == 6
 
 
+class Point:
+    __slots__ = ["x", "y"]
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+
+def test_typed_handler():
+    serializer = msgpickle.MsgPickle(use_default=False)
+    serializer.add_hook(lambda cls, data: cls(*data))
+    serializer.add_handler(lambda o: [str(o)], types=(int, str))
+    with pytest.raises(TypeError):
+        serializer.dumps(Point(1, 2))
+
+    serializer.add_handler(lambda o: [o.x, o.y], types=(Point,))
+    ser = serializer.dumps([Point(1, 2), Point(3, 4)])
+    deser = serializer.loads(ser)
+    assert deser[1].x == 3 and deser[1].y == 4
+
+
 def test_non_serializable_stuff(tmp_path):
     serializer = msgpickle.MsgPickle()
 
@@ -217,6 +536,60 @@ def test_slotted():
     deser = serializer.loads(ser)
     assert deser.attr == obj.attr
 
+    # unset slots are left out, and stay unset
+    del obj.attr
+    deser = serializer.loads(serializer.dumps(obj))
+    assert type(deser) is Slotted and not hasattr(deser, "attr")
+
+
+def test_slotted_bad_data():
+    ser = msgpack.dumps(
+        {
+            msgpickle.MsgPickle.CLASS: "Slotted",
+            msgpickle.MsgPickle.MODULE: __name__,
+            msgpickle.MsgPickle.DATA: 5,
+        }
+    )
+    with pytest.raises(TypeError):
+        msgpickle.MsgPickle().loads(ser)
+
+
+class SlottedSub(Slotted):
+    __slots__ = ("__hidden", "extra")
+
+    def __init__(self, attr, hidden, extra):
+        super().__init__(attr)
+        self.__hidden = hidden
+        self.extra = extra
+
+    @property
+    def hidden(self):
+        return self.__hidden
+
+
+def test_slotted_inherited():
+    serializer = msgpickle.MsgPickle()
+    obj = SlottedSub(1, 2, 3)
+    deser = serializer.loads(serializer.dumps(obj))
+    assert (deser.attr, deser.hidden, deser.extra) == (1, 2, 3)
+
+
+class SlottedChild(Slotted):
+    pass
+
+
+def test_slotted_child():
+    serializer = msgpickle.MsgPickle()
+    obj = SlottedChild(123)
+    obj.extra = 4
+    deser = serializer.loads(serializer.dumps(obj))
+    assert deser.attr == 123 and deser.extra == 4
+    assert obj.__dict__ == {"extra": 4}
+
+    del obj.attr
+    deser = serializer.loads(serializer.dumps(obj))
+    assert not hasattr(deser, "attr") and deser.extra == 4
+
 
 def test_bad_loader():
     serializer = msgpickle.MsgPickle()
@@ -240,6 +613,74 @@ def test_bad_loader():
         serializer.loads(ser)
 
 
+def test_bad_ext_loader():
+    serializer = msgpickle.MsgPickle(use_ext=True)
+    for envelope in ([2, 1, 3], ["datetime", "datetime", None]):
+        ext = msgpack.ExtType(msgpickle.MsgPickle.EXT, msgpack.dumps(envelope))
+        with pytest.raises(TypeError):
+            serializer.loads(msgpack.dumps(ext))
+
+
+def test_plain_dicts_untouched():
+    obj = [{".": 1, "#": 2}, {".": 1, "#": 2, "x": 3}, {".": 1, "#": 2, "d": 3, "x": 4}]
+    assert msgpickle.loads(msgpickle.dumps(obj)) == obj
+
+
+def test_non_str_keys():
+    obj = {1: "a", 2.5: [ExampleDataClass(3, "b")]}
+    deserialized = msgpickle.loads(msgpickle.dumps(obj))
+    assert deserialized[1] == "a" and deserialized[2.5][0].field1 == 3
+    assert next(msgpickle.loads_many(msgpickle.dumps_many([obj])))[1] == "a"
+
+
+def test_missing_class_cached():
+    serializer = msgpickle.MsgPickle()
+    ser = msgpack.dumps(
+        {
+            msgpickle.MsgPickle.CLASS: "Missing",
+            msgpickle.MsgPickle.MODULE: "datetime",
+            msgpickle.MsgPickle.DATA: None,
+        }
+    )
+    for _ in range(2):
+        with pytest.raises(TypeError):
+            serializer.loads(ser)
+    assert ("datetime", "Missing") not in serializer._cls_cache
+
+
+def test_bogus_names_not_cached():
+    serializer = msgpickle.MsgPickle()
+    for i in range(1000):
+        ser = msgpack.dumps(
+            {
+                msgpickle.MsgPickle.CLASS: f"Missing{i}",
+                msgpickle.MsgPickle.MODULE: "datetime",
+                msgpickle.MsgPickle.DATA: None,
+            }
+        )
+        with pytest.raises(TypeError):
+            serializer.loads(ser)
+    assert not serializer._cls_cache
+
+
+def test_rebound_class_resolved_again():
+    global Rebound
+    serializer = msgpickle.MsgPickle()
+
+    class Rebound:
+        def __init__(self, val):
+            self.val = val
+
+    first = Rebound
+    assert type(serializer.loads(serializer.dumps(Rebound(1)))) is first
+
+    class Rebound:  # type: ignore[no-redef]
+        def __init__(self, val):
+            self.val = val
+
+    assert type(serializer.loads(serializer.dumps(Rebound(2)))) is Rebound
+
+
 def test_bad_obj():
     class BadClass:
         pass
@@ -249,5 +690,6 @@ def test_bad_obj():
     # don't serialize classes that don't have a normalish __dict__
     b.__dict__ = defaultdict()
 
-    with pytest.raises(TypeError):
+    with pytest.raises(TypeError) as exc_info:
         msgpickle.dumps(b)
+    assert "BadClass" in str(exc_info.value)